@@ -8,19 +8,61 @@ import subprocess
 import datetime
 import configparser
 import os
+import glob
+import fcntl
 import traceback
-import ntplib
 import socket
+import struct
+import heapq
+import functools
+import array
+import atexit
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 # 配置文件路径
 CONFIG_FILE = "/etc/oled-display.conf"
 
+# 调度间隔（秒）
+INFO_REFRESH_INTERVAL = 10
+GROUP_SWAP_INTERVAL = 5
+NTP_SYNC_INTERVAL = 21600  # 每6小时同步一次时间
+MAX_RESTART_BACKOFF = 16  # 出错后重新初始化的最长等待
+MAX_RESTARTS = 5  # 连续重启失败次数上限，超过后退出交给systemd处理
+
+# NTP时间戳以1900-01-01为纪元，与Unix时间相差的秒数
+NTP_EPOCH_OFFSET = 2208988800
+
+# 变化缓慢的信息缓存（IP地址5分钟，存储空间30秒）
+IP_CACHE_TTL = 300
+DISK_CACHE_TTL = 30
+_ip_cache = {'value': None, 'ts': 0}
+_disk_cache = {'value': None, 'ts': 0}
+
+# 日志文件常驻打开（行缓冲），避免每条日志都open/close
+LOG_FILE = "/tmp/oled-display.log"
+try:
+    _LOG_FH = open(LOG_FILE, "a", buffering=1)
+    atexit.register(_LOG_FH.close)
+except OSError:
+    _LOG_FH = None
+
 def log_error(message):
-    with open("/tmp/oled-display.log", "a") as f:
-        try:
-            f.write(f"{datetime.datetime.now()}: {message}\n")
-        except:
-            pass  # 如果日志写入失败也不影响主程序运行
+    try:
+        _LOG_FH.write(f"{datetime.datetime.now()}: {message}\n")
+    except:
+        pass  # 如果日志写入失败也不影响主程序运行
+
+# 各类错误最近一次记录的内容，用于抑制重启循环中的重复日志
+_last_logged = {}
+
+def log_error_once(key, message, detail=""):
+    """同一类错误内容与上次相同时不再重复记录"""
+    if _last_logged.get(key) == message:
+        return
+    _last_logged[key] = message
+    log_error(f"{message}\n{detail}" if detail else message)
 
 def load_config():
     config = configparser.ConfigParser()
@@ -39,56 +81,213 @@ def load_config():
     return {'width': 128, 'height': 32, 'scroll_speed': 0.1,
             'ntp_server': 'ntp.ntsc.ac.cn', 'timeout': 3}
 
+# 取本机地址时跳过的虚拟网卡（容器网桥、虚拟以太网对等）
+VIRTUAL_IFACE_PREFIXES = ("docker", "br-", "veth", "virbr", "lxcbr", "cni", "flannel")
+SIOCGIFADDR = 0x8915
+
+def get_interface_address():
+    """按网卡序号返回第一个非回环、非虚拟网卡的IPv4地址，没有时返回None"""
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        for _, name in socket.if_nameindex():
+            if name == "lo" or name.startswith(VIRTUAL_IFACE_PREFIXES):
+                continue
+            try:
+                ifreq = fcntl.ioctl(sock.fileno(), SIOCGIFADDR, struct.pack('256s', name[:15].encode()))
+            except OSError:
+                continue  # 网卡未启用或没有IPv4地址
+            return socket.inet_ntoa(ifreq[20:24])
+    return None
+
+def get_ip_address():
+    """返回显示用的IPv4地址，获取不到时返回None
+
+    优先取默认路由出口的地址；没有默认路由（无网关的局域网、静态IP）时
+    退回到本机第一个物理网卡的地址。与 hostname -I 的首项通常相同，但不保证一致。
+    """
+    try:
+        # UDP的connect只做路由选择，不会发出任何数据包
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.connect(("8.8.8.8", 80))
+            return sock.getsockname()[0]
+    except OSError:
+        pass
+    try:
+        return get_interface_address()
+    except OSError:
+        return None
+
+def get_cpu_temp():
+    """读取CPU温度（摄氏度），thermal_zone0不可用时查找hwmon中的cpu_thermal传感器"""
+    try:
+        with open("/sys/class/thermal/thermal_zone0/temp") as f:
+            return int(f.read()) / 1000
+    except (OSError, ValueError):
+        pass
+    for hwmon in sorted(glob.glob("/sys/class/hwmon/hwmon*")):
+        try:
+            with open(os.path.join(hwmon, "name")) as f:
+                if f.read().strip() != "cpu_thermal":
+                    continue
+            with open(os.path.join(hwmon, "temp1_input")) as f:
+                return int(f.read()) / 1000
+        except (OSError, ValueError):
+            continue
+    raise OSError("未找到CPU温度传感器")
+
+def get_memory_usage():
+    """解析/proc/meminfo，返回 已用/总量 MB"""
+    meminfo = {}
+    with open("/proc/meminfo") as f:
+        for line in f:
+            key, value = line.split(":", 1)
+            meminfo[key] = int(value.split()[0])  # 单位kB
+    total = meminfo["MemTotal"] // 1024
+    used = (meminfo["MemTotal"] - meminfo["MemAvailable"]) // 1024
+    return f"{used}/{total}MB"
+
+def format_size(size):
+    """按 df -h 的方式格式化字节数"""
+    for unit in ("B", "K", "M", "G", "T"):
+        if size < 1024 or unit == "T":
+            break
+        size /= 1024
+    return f"{size:.1f}{unit}" if size < 10 and unit != "B" else f"{size:.0f}{unit}"
+
+def get_disk_usage(path="/"):
+    """通过statvfs计算根分区 已用/总量"""
+    st = os.statvfs(path)
+    used = (st.f_blocks - st.f_bfree) * st.f_frsize
+    total = st.f_blocks * st.f_frsize
+    return f"{format_size(used)}/{format_size(total)}"
+
+def cached(cache, ttl, func):
+    """在TTL内返回缓存值，过期后重新获取；func返回None表示获取失败，不缓存"""
+    now = time.monotonic()
+    if cache['value'] is None or now - cache['ts'] > ttl:
+        cache['value'] = func()
+        cache['ts'] = now
+    return cache['value']
+
+# 字节内位序反转表：PIL 1位图按行高位在前打包，SSD1306页数据按列低位在上
+_BIT_REVERSE = bytes(int(f"{i:08b}"[::-1], 2) for i in range(256))
+
+def flush_dirty(device, image, dirty_rows):
+    """只把脏行所在的8行页带写入SSD1306，dirty_rows为(起始行, 结束行)列表"""
+    if not dirty_rows:
+        return
+    first_page = min(top for top, _ in dirty_rows) // 8
+    last_page = min(max(bottom for _, bottom in dirty_rows), device.height - 1) // 8
+    pages = last_page - first_page + 1
+
+    band = device.preprocess(image).crop((0, first_page * 8, device.width, (last_page + 1) * 8))
+    # 转置后原图每一列变为一行，每个字节正好是同一列中一页的8个像素
+    columns = band.transpose(Image.TRANSPOSE).tobytes().translate(_BIT_REVERSE)
+    buf = b"".join(columns[page::pages] for page in range(pages))
+
+    device.command(
+        device._const.COLUMNADDR, device._colstart, device._colend - 1,
+        device._const.PAGEADDR, first_page, last_page)
+    device.data(list(buf))
+
+def run_as_root(cmd):
+    """以root权限执行命令；服务本身以root运行时不再额外派生sudo进程"""
+    if os.geteuid() != 0:
+        cmd = ['sudo'] + cmd
+    subprocess.run(cmd, check=True)
+
+def sntp_request(server, timeout):
+    """发送48字节SNTP请求，返回服务器发送时间戳（Unix时间）"""
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.settimeout(timeout)
+        sock.sendto(b'\x1b' + b'\0' * 47, (server, 123))  # LI=0, VN=3, Mode=3(客户端)
+        data, _ = sock.recvfrom(48)
+    if len(data) < 48:
+        raise OSError(f"SNTP响应长度异常: {len(data)}字节")
+    leap, mode, stratum = data[0] >> 6, data[0] & 7, data[1]
+    if mode != 4:
+        raise OSError(f"SNTP响应模式异常: {mode}")
+    if stratum == 0:
+        raise OSError(f"SNTP服务器拒绝请求(KoD): {data[12:16].decode('ascii', 'replace')}")
+    if leap == 3:
+        raise OSError("SNTP服务器时间未同步")
+    secs, frac = struct.unpack('!II', data[40:48])
+    if secs == 0:
+        raise OSError("SNTP响应缺少发送时间戳")
+    return secs - NTP_EPOCH_OFFSET + frac / 2**32
+
+def set_system_time(timestamp):
+    """设置系统时间：具备CAP_SYS_TIME时直接调用clock_settime，否则回退到date命令"""
+    try:
+        time.clock_settime(time.CLOCK_REALTIME, timestamp)
+    except PermissionError:
+        run_as_root(['date', '-s', f"@{timestamp:.3f}"])
+
 def sync_time(config):
     """时间同步函数（网络优先）"""
-    def check_network():
-        try:
-            socket.create_connection((config['ntp_server'], 123), timeout=2)
-            return True
-        except OSError:
-            return False
-    
-    # 优先尝试NTP同步（仅在网络连通时）
-    if check_network():
-        try:
-            client = ntplib.NTPClient()
-            response = client.request(config['ntp_server'], timeout=config['timeout'])
-            ntp_time = datetime.datetime.fromtimestamp(response.tx_time)
-            subprocess.run(['sudo', 'date', '-s', ntp_time.strftime('%Y-%m-%d %H:%M:%S')], check=True)
-            log_error(f"NTP同步成功: {ntp_time}")
-            return "时间同步: NTP成功"
-        except (ntplib.NTPException, socket.gaierror, subprocess.CalledProcessError) as e:
-            log_error(f"NTP同步失败: {str(e)}")
-    
+    # 优先尝试NTP同步（网络不通时请求会在超时后失败）
+    try:
+        ntp_timestamp = sntp_request(config['ntp_server'], config['timeout'])
+        set_system_time(ntp_timestamp)
+        ntp_time = datetime.datetime.fromtimestamp(ntp_timestamp)
+        log_error(f"NTP同步成功: {ntp_time}")
+        return "时间同步: NTP成功"
+    except (OSError, subprocess.CalledProcessError) as e:
+        log_error(f"NTP同步失败: {str(e)}")
+
     # 次选RTC同步
     try:
-        subprocess.run(['sudo', 'hwclock', '--hctosys'], check=True)
+        run_as_root(['hwclock', '--hctosys'])
         log_error("RTC同步成功")
         return "RTC同步成功"
-    except subprocess.CalledProcessError as e:
+    except (OSError, subprocess.CalledProcessError) as e:
         log_error(f"RTC同步失败: {str(e)}")
         return "RTC同步失败"
 
-def main():
+def sd_notify(state):
+    """向systemd发送状态通知，不在systemd下运行时忽略"""
+    address = os.environ.get('NOTIFY_SOCKET')
+    if not address:
+        return
+    if address.startswith('@'):
+        address = '\0' + address[1:]  # 抽象命名空间套接字
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.connect(address)
+            sock.sendall(state.encode())
+    except OSError as e:
+        log_error(f"systemd通知失败: {str(e)}")
+
+def run_display(executor, sync_state):
+    """初始化设备并运行显示循环，正常退出时清屏，其余异常交给main重试"""
+    device = None
+    device_lock = threading.Lock()  # 串行化对I2C设备的访问
     try:
         config = load_config()
-        scroll_pos = {}  # 存储各行的滚动位置
-        
-        # 初始化时间同步状态
-        time_sync_status = sync_time(config)
-        last_sync_time = time.time()
+        scroll_pos = []  # 存储各行的滚动位置，每组一个整数数组
 
         # 初始化显示设备（增加重试机制）
         for _ in range(3):
+            serial = None
             try:
                 serial = i2c(port=1, address=0x3C)
+                # 先用关屏命令探测设备是否在线；ssd1306构造时会注册atexit钩子，探测失败就不再创建
+                serial.command(0xAE)
                 device = ssd1306(serial, width=config['width'], height=config['height'])
                 break
             except Exception as e:
-                log_error(f"显示初始化尝试失败: {str(e)}")
+                log_error_once('display_init', f"显示初始化尝试失败: {str(e)}")
+                if serial is not None:
+                    serial.cleanup()  # 关闭本次打开的I2C总线，避免文件描述符泄漏
                 time.sleep(2)
         else:
             raise RuntimeError("显示初始化3次尝试均失败")
+        _last_logged.pop('display_init', None)
+
+        display_future = None
+
+        def push_frame(frame, dirty_rows):
+            with device_lock:
+                flush_dirty(device, frame, dirty_rows)
 
         # 字体配置
         def load_font():
@@ -102,10 +301,13 @@ def main():
 
         font = load_font()
 
+        # 行高只与字体有关，加载字体时计算一次
+        _, text_top, _, text_bottom = font.getbbox("测试")
+        line_height = text_bottom + 2
+
         # 计算屏幕可显示行数
         def calculate_lines():
-            left, top, right, bottom = font.getbbox("测试")
-            text_height = bottom - top
+            text_height = text_bottom - text_top
             return config['height'] // (text_height + 2)  # 行间距2像素
 
         max_lines = calculate_lines()
@@ -115,21 +317,29 @@ def main():
             now = datetime.datetime.now()
             try:
                 # 获取CPU温度并转换为中文单位
-                cpu_temp = subprocess.getoutput("vcgencmd measure_temp | cut -d= -f2")
-                cpu_temp = cpu_temp.replace("'C", "").strip()
-                cpu_temp = f"{float(cpu_temp):.1f}摄氏度"
+                cpu_temp = f"{get_cpu_temp():.1f}摄氏度"
             except:
                 cpu_temp = "N/A"
-            
+
+            # 直接读取/proc和系统调用，避免每次刷新都创建shell子进程
+            try:
+                mem_usage = get_memory_usage()
+            except (OSError, KeyError, ValueError):
+                mem_usage = "N/A"
+            try:
+                disk_usage = cached(_disk_cache, DISK_CACHE_TTL, get_disk_usage)
+            except OSError:
+                disk_usage = "N/A"
+
             return {
-                "IP地址": subprocess.getoutput("hostname -I | awk '{print $1}'"),
+                "IP地址": cached(_ip_cache, IP_CACHE_TTL, get_ip_address) or "N/A",
                 "当前日期": now.strftime("%Y年%m月%d日"),
                 "当前时间": now.strftime("%H时%M分%S秒"),
-                "时间同步": time_sync_status,
-                "CPU负载": subprocess.getoutput("top -bn1 | grep load | awk '{printf \"%.1f\", $(NF-2)}'") + "%",
+                "时间同步": sync_state['status'],
+                "CPU负载": f"{os.getloadavg()[0]:.1f}%",
                 "CPU温度": cpu_temp,
-                "内存使用": subprocess.getoutput("free -m | awk 'NR==2{printf \"%d/%dMB\", $3,$2}'"),
-                "存储空间": subprocess.getoutput("df -h | awk '$NF==\"/\"{printf \"%s/%s\", $3,$2}'")
+                "内存使用": mem_usage,
+                "存储空间": disk_usage
             }
 
         # 信息分组策略（保持时间日期相邻）
@@ -158,63 +368,234 @@ def main():
                 i += remaining_lines
                 
                 groups.append(group)
-                scroll_pos[len(groups)-1] = {}
+
+            # 刷新信息时滚动位置归零，分组结构不变时复用已有数组
+            if [len(positions) for positions in scroll_pos] != [len(group) for group in groups]:
+                scroll_pos[:] = [array.array('i', [0] * len(group)) for group in groups]
+            else:
+                for positions in scroll_pos:
+                    for i in range(len(positions)):
+                        positions[i] = 0
             return groups
 
-        # 绘制显示内容（添加滚动功能）
-        def draw_info(draw, info_group, group_index, y_offset=0):
-            for i, (key, value) in enumerate(info_group.items()):
-                text = f"{key}: {value}"
-                text_width = font.getlength(text)
-                
-                if i not in scroll_pos[group_index]:
-                    scroll_pos[group_index][i] = 0
-                
-                if text_width > config['width']:
-                    scroll_pos[group_index][i] -= 1
-                    if scroll_pos[group_index][i] < -text_width:
-                        scroll_pos[group_index][i] = config['width']
-                    x = scroll_pos[group_index][i]
+        # 数值多为重复出现的字符串（温度、N/A等），缓存其宽度
+        @functools.lru_cache(maxsize=32)
+        def value_width(value):
+            return font.getlength(value)
+
+        # 信息刷新时预先排版：每行的(文本, 文本宽度, 是否需要滚动)
+        def prepare_lines(groups):
+            rendered = []
+            for group in groups:
+                lines = []
+                for key, value in group.items():
+                    text = f"{key}: {value}"
+                    text_width = label_widths[key] + value_width(value)
+                    lines.append((text, text_width, text_width > config['width']))
+                rendered.append(lines)
+            return rendered
+
+        # 静止行的位图缓存：中文字形光栅化开销大，相同内容只画一次
+        @functools.lru_cache(maxsize=64)
+        def render_line(text, x):
+            line = Image.new("1", (config['width'], line_height))
+            ImageDraw.Draw(line).text((x, 0), text, font=font, fill=255)
+            return line
+
+        # 上一帧各行绘制的(文本, x坐标)，用于跳过未变化的帧和行
+        last_frame = []
+
+        # 绘制显示内容（添加滚动功能），返回需要刷新的行区间
+        def draw_info(image, draw, rendered_group, group_index, y_offset=0):
+            positions = scroll_pos[group_index]
+            frame_lines = []
+            for i, (text, text_width, needs_scroll) in enumerate(rendered_group):
+                if needs_scroll:
+                    positions[i] -= 1
+                    if positions[i] < -text_width:
+                        positions[i] = config['width']
+                    x = positions[i]
                 else:
                     x = (config['width'] - text_width) // 2
-                
-                left, top, right, bottom = font.getbbox("测试")
-                y = y_offset + i*(bottom + 2)
-                
-                draw.text((x, y), text, font=font, fill=255)
+                frame_lines.append((text, x))
+
+            # 画面内容与上一帧完全相同时不绘制也不刷新
+            if frame_lines == last_frame:
+                return []
 
-        info_groups = group_infos(get_system_info())
+            dirty_rows = []
+            for i, (text, x) in enumerate(frame_lines):
+                if i < len(last_frame) and last_frame[i] == (text, x):
+                    continue
+
+                y = y_offset + i*line_height
+                if rendered_group[i][2]:
+                    draw.rectangle((0, y, config['width'] - 1, y + line_height - 1), fill=0)
+                    draw.text((x, y), text, font=font, fill=255)
+                else:
+                    image.paste(render_line(text, x), (0, y))  # 整行覆盖，无需先清除
+                dirty_rows.append((y, y + line_height - 1))
+
+            # 清除上一组多出来的行
+            for i in range(len(frame_lines), len(last_frame)):
+                y = y_offset + i*line_height
+                draw.rectangle((0, y, config['width'] - 1, y + line_height - 1), fill=0)
+                dirty_rows.append((y, y + line_height - 1))
+
+            last_frame[:] = frame_lines
+            return dirty_rows
+
+        system_info = get_system_info()
+        # 标签是固定的几项，"标签: "前缀宽度启动时计算一次
+        label_widths = {key: font.getlength(f"{key}: ") for key in system_info}
+        info_groups = group_infos(system_info)
+        rendered_groups = prepare_lines(info_groups)
         current_group = 0
-        last_scroll_time = time.time()
+
+        # 画布跨帧复用，只重绘和刷新发生变化的行
+        image = Image.new("1", (config['width'], config['height']))
+        draw = ImageDraw.Draw(image)
+        # 交给后台线程写入I2C的帧缓冲，同样只分配一次
+        frame = Image.new("1", (config['width'], config['height']))
+
+        # 按绝对截止时间调度各任务；使用单调时钟，不受 date -s 校时影响
+        now = time.monotonic()
+        deadlines = {
+            'scroll': now,
+            'info_refresh': now + INFO_REFRESH_INTERVAL,
+            'group_swap': now + GROUP_SWAP_INTERVAL,
+            'ntp_sync': sync_state['deadline'],
+        }
+        # systemd启用看门狗时按超时时间的一半喂狗
+        watchdog_interval = int(os.environ.get('WATCHDOG_USEC', 0)) / 2e6
+        if watchdog_interval:
+            deadlines['watchdog'] = now
+        ready = False
+        schedule = [(deadline, name) for name, deadline in deadlines.items()]
+        heapq.heapify(schedule)
+
+        def reschedule(name, deadline):
+            deadlines[name] = deadline
+            heapq.heappush(schedule, (deadline, name))
 
         while True:
-            current_time = time.time()
-            
-            # 每6小时同步一次时间
-            if current_time - last_sync_time > 21600:
-                time_sync_status = sync_time(config)
+            deadline, name = heapq.heappop(schedule)
+            if deadline != deadlines[name]:
+                continue  # 已被重新调度的旧条目
+
+            time.sleep(max(0, deadline - time.monotonic()))
+            now = time.monotonic()
+
+            # 后台时间同步完成后更新状态并立即刷新信息
+            sync_future = sync_state['future']
+            if sync_future is not None and sync_future.done():
+                try:
+                    sync_state['status'] = sync_future.result()
+                except Exception as e:
+                    # 时间同步失败不能影响显示循环
+                    log_error(f"时间同步异常: {str(e)}")
+                    sync_state['status'] = "时间同步失败"
+                sync_state['future'] = None
                 info_groups = group_infos(get_system_info())
-                last_sync_time = current_time
-            
-            if current_time - last_scroll_time > config['scroll_speed']:
-                image = Image.new("1", (config['width'], config['height']))
-                draw = ImageDraw.Draw(image)
-                draw_info(draw, info_groups[current_group], current_group)
-                device.display(image)
-                last_scroll_time = current_time
-            
-            if current_time % 10 < 0.1:
+                rendered_groups = prepare_lines(info_groups)
+                reschedule('scroll', now)
+
+            if name == 'watchdog':
+                sd_notify("WATCHDOG=1")
+                reschedule('watchdog', now + watchdog_interval)
+
+            elif name == 'ntp_sync':
+                if sync_state['future'] is None:
+                    sync_state['future'] = executor.submit(sync_time, config)
+                sync_state['deadline'] = now + NTP_SYNC_INTERVAL
+                reschedule('ntp_sync', sync_state['deadline'])
+
+            elif name == 'info_refresh':
                 info_groups = group_infos(get_system_info())
-            
-            if current_time % 5 < 0.1:
+                rendered_groups = prepare_lines(info_groups)
+                reschedule('info_refresh', deadline + INFO_REFRESH_INTERVAL)
+                reschedule('scroll', now)
+
+            elif name == 'group_swap':
                 current_group = (current_group + 1) % len(info_groups)
-            
-            time.sleep(0.1)
+                reschedule('group_swap', deadline + GROUP_SWAP_INTERVAL)
+                reschedule('scroll', now)
 
-    except KeyboardInterrupt:
-        device.clear()
-    except Exception as e:
-        log_error(f"主循环错误: {str(e)}\n{traceback.format_exc()}")
+            elif name == 'scroll':
+                dirty_rows = draw_info(image, draw, rendered_groups[current_group], current_group)
+                if dirty_rows:
+                    # 双缓冲：上一帧写完后把画布拷入帧缓冲再提交，主线程继续绘制下一帧
+                    if display_future is not None:
+                        display_future.result()
+                    frame.paste(image)
+                    display_future = executor.submit(push_frame, frame, dirty_rows)
+                # 第一帧成功显示后通知systemd启动完成
+                if not ready:
+                    if display_future is not None:
+                        display_future.result()
+                    sd_notify("READY=1")
+                    ready = True
+                # 当前组没有滚动行时一直睡到下次切换分组
+                if any(needs_scroll for _, _, needs_scroll in rendered_groups[current_group]):
+                    reschedule('scroll', max(deadline + config['scroll_speed'], now))
+                else:
+                    reschedule('scroll', deadlines['group_swap'])
+
+    except (KeyboardInterrupt, SystemExit):
+        # Ctrl+C或systemd停止服务（SIGTERM）时清屏退出
+        sd_notify("STOPPING=1")
+        if device is not None:
+            with device_lock:
+                device.clear()
+    except Exception:
+        # 出错时先释放I2C总线，main重试时从关闭的总线重新初始化
+        if device is not None:
+            with device_lock:
+                try:
+                    device.cleanup()
+                except Exception as e:
+                    log_error(f"显示设备清理失败: {str(e)}")
+                    try:
+                        device._serial_interface.cleanup()  # 熄屏失败也要关闭总线
+                    except Exception:
+                        pass
+        raise
+
+def main():
+    # SIGTERM转换为SystemExit，走和Ctrl+C相同的清屏退出流程
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    # 阻塞的NTP同步和I2C写入放到后台线程，渲染循环不被卡住
+    executor = ThreadPoolExecutor(max_workers=2)
+    # 时间同步状态跨设备重启保留，重新初始化设备时不会重复请求NTP；
+    # 首次同步在设备初始化成功后的第一轮循环中发起
+    sync_state = {'future': None, 'status': "时间同步: 进行中", 'deadline': time.monotonic()}
+
+    # I2C等偶发故障后按指数退避重新初始化设备，而不是直接退出
+    backoff = 1
+    failures = 0
+    try:
+        while True:
+            started = time.monotonic()
+            try:
+                run_display(executor, sync_state)
+                return
+            except Exception as e:
+                log_error_once('main', f"主循环错误: {str(e)}", traceback.format_exc())
+            if time.monotonic() - started > MAX_RESTART_BACKOFF:
+                backoff = 1  # 已稳定运行一段时间，视为新的故障
+                failures = 0
+                _last_logged.pop('main', None)
+            failures += 1
+            if failures >= MAX_RESTARTS:
+                # 持续失败（如显示屏未连接）时退出，由systemd的重启间隔和StartLimitBurst接管
+                log_error(f"连续{failures}次重新初始化失败，退出")
+                sys.exit(1)
+            sd_notify("WATCHDOG=1")
+            time.sleep(backoff)
+            backoff = min(backoff * 2, MAX_RESTART_BACKOFF)
+    finally:
+        executor.shutdown(wait=False)
 
 if __name__ == "__main__":
     main()